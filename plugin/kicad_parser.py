@@ -1,12 +1,41 @@
 """
 Minimal S-expression parser for KiCad files.
 Parses KiCad's S-expression format without external dependencies.
+
+Deliberately pure Python: the plugin is distributed as a source zip and
+runs inside whatever interpreter KiCad bundles on each platform, so a
+compiled extension (Cython/Numba) is not an option. The hot loops are
+kept in C anyway by driving the scan with a single compiled regex.
 """
 
-from typing import Any, List, Optional, Union
+import re
+import sys
+from array import array
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 SExpr = Union[str, List["SExpr"]]
 
+# One alternation matching any token: whitespace run, paren, quoted string,
+# or unquoted atom. finditer drives the whole scan inside the regex engine.
+# Whitespace is left uncaptured (lastindex None) and the quoted branch
+# captures only the content between the quotes, so the engine hands back
+# the stripped string with no Python-level slice.
+_TOKEN_RE = re.compile(r'\s+|(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+)')
+
+# Atoms at or below this length get interned; KiCad files repeat a small
+# vocabulary ("property", "at", "uuid", ...) millions of times.
+_INTERN_MAX_LEN = 24
+
 
 def parse_kicad(text: str) -> SExpr:
     """
@@ -18,97 +47,279 @@ def parse_kicad(text: str) -> SExpr:
     Returns:
         Nested list structure representing the S-expression
 
+    Raises:
+        ValueError: If the input contains unlexable characters
+            (in practice, an unterminated quoted string)
+
     Example:
         >>> parse_sexpr('(kicad_sch (version 20230101))')
         ['kicad_sch', ['version', '20230101']]
     """
-    tokens = _tokenize(text)
-    result, _ = _parse_tokens(tokens, 0)
+    result, _ = _parse_tokens(text, 0)
     return result
 
 
-def _tokenize(text: str) -> List[str]:
-    """Tokenize S-expression text into a list of tokens."""
-    tokens: List[str] = []
-    i = 0
-    length = len(text)
+def _parse_tokens(text: str, pos: int) -> "tuple[SExpr, int]":
+    """
+    Parse one expression from text starting at position.
+
+    Scans the source string directly in a single pass, building list
+    nodes as it goes, rather than tokenizing into an intermediate list
+    first. One compiled regex drives the scan so each token is found in
+    C instead of by per-character dispatch. Returns (result,
+    new_position).
+
+    Raises:
+        ValueError: If the input contains unlexable characters
+            (in practice, an unterminated quoted string)
+    """
+    stack: List[List[SExpr]] = []
+    expected = pos
+
+    # Bind the innermost open node's append so the hot atom/string
+    # branches skip the stack[-1] index and LOAD_ATTR per token; intern
+    # is localized for the same reason. append is None exactly while no
+    # node is open.
+    append = None
+    intern = sys.intern
+
+    for match in _TOKEN_RE.finditer(text, pos):
+        # The token alternation covers all well-formed input, so a gap
+        # between consecutive matches means an unlexable character
+        if match.start() != expected:
+            msg = f"Malformed S-expression at offset {expected}"
+            raise ValueError(msg)
+        expected = match.end()
+
+        group = match.lastindex
+
+        # Whitespace run (no capturing group matched)
+        if group is None:
+            continue
+
+        # Open a new list node
+        if group == 1:
+            node: List[SExpr] = []
+            if append is not None:
+                append(node)
+            stack.append(node)
+            append = node.append
+            continue
 
-    while i < length:
-        char = text[i]
+        # Close the current list node
+        if group == 2:
+            finished = stack.pop() if stack else []
+            if not stack:
+                return finished, expected
+            append = stack[-1].append
+            continue
 
-        # Skip whitespace
-        if char in " \t\n\r":
-            i += 1
+        # Quoted string (already stripped by the capture; handle escapes)
+        if group == 3:
+            value = match.group(3)
+            if "\\" in value:
+                value = value.replace('\\"', '"')
+                value = value.replace("\\\\", "\\")
+            if append is None:
+                return value, expected
+            append(value)
             continue
 
-        # Opening/closing parentheses
-        if char == "(":
-            tokens.append("(")
-            i += 1
+        # Unquoted atom (symbol, number, etc.). Interning collapses the
+        # many repeats into shared storage and lets later == comparisons
+        # hit CPython's pointer-equality fast path.
+        atom = match.group()
+        if len(atom) <= _INTERN_MAX_LEN:
+            atom = intern(atom)
+        if append is None:
+            return atom, expected
+        append(atom)
+
+    if expected < len(text):
+        msg = f"Malformed S-expression at offset {expected}"
+        raise ValueError(msg)
+
+    # Unterminated input: return the outermost list built so far
+    return (stack[0] if stack else []), len(text)
+
+
+class FlatTree(NamedTuple):
+    """
+    Structure-of-arrays form of a parsed S-expression.
+
+    Instead of one Python list per node, the whole document becomes
+    three parallel columns indexed by node id, which slashes object
+    count and makes tag scans a flat sequential pass:
+
+    - tags: first atom of each list node (None for headless lists)
+    - parent: node id of each node's enclosing list (-1 for the root)
+    - atoms: remaining atoms of each node, in order
+
+    Parents are created before their children, so parent[i] < i; a
+    single forward pass can therefore match child nodes against
+    already-seen parents.
+    """
+
+    tags: List[Optional[str]]
+    parent: "array"
+    atoms: List[List[str]]
+
+
+def parse_kicad_flat(text: str) -> FlatTree:
+    """
+    Parse S-expression text into a FlatTree.
+
+    Compact alternative to parse_kicad for scan-heavy consumers like
+    ProjectCollector that only ever look at tags and atoms; the nested
+    list API remains the general-purpose representation.
+
+    Args:
+        text: S-expression formatted string
+
+    Returns:
+        FlatTree with one entry per list node in document order
+
+    Raises:
+        ValueError: If the input contains unlexable characters
+    """
+    tags: List[Optional[str]] = []
+    parent = array("i")
+    atoms: List[List[str]] = []
+    started: List[bool] = []  # whether node i has any child yet
+
+    stack: List[int] = []  # indices of open nodes
+    expected = 0
+
+    for match in _TOKEN_RE.finditer(text):
+        if match.start() != expected:
+            msg = f"Malformed S-expression at offset {expected}"
+            raise ValueError(msg)
+        expected = match.end()
+
+        group = match.lastindex
+
+        # Whitespace run (no capturing group matched)
+        if group is None:
             continue
 
-        if char == ")":
-            tokens.append(")")
-            i += 1
+        # Open a new node
+        if group == 1:
+            index = len(tags)
+            if stack:
+                started[stack[-1]] = True
+                parent.append(stack[-1])
+            else:
+                parent.append(-1)
+            tags.append(None)
+            atoms.append([])
+            started.append(False)
+            stack.append(index)
             continue
 
-        # Quoted string
-        if char == '"':
-            j = i + 1
-            while j < length:
-                if text[j] == "\\":
-                    j += 2  # Skip escaped character
-                elif text[j] == '"':
-                    break
-                else:
-                    j += 1
-            # Include quotes in token, will be stripped later
-            tokens.append(text[i : j + 1])
-            i = j + 1
+        # Close the current node; stop at the root's closing paren
+        if group == 2:
+            if stack:
+                stack.pop()
+                if not stack:
+                    return FlatTree(tags, parent, atoms)
             continue
 
-        # Unquoted atom (symbol, number, etc.)
-        j = i
-        while j < length and text[j] not in " \t\n\r()\"":
-            j += 1
-        tokens.append(text[i:j])
-        i = j
-
-    return tokens
-
-
-def _parse_tokens(tokens: List[str], pos: int) -> tuple[SExpr, int]:
-    """Parse tokens starting at position, return (result, new_position)."""
-    if pos >= len(tokens):
-        return [], pos
-
-    token = tokens[pos]
-
-    if token == "(":
-        # Parse a list
-        result: List[SExpr] = []
-        pos += 1
-        while pos < len(tokens) and tokens[pos] != ")":
-            item, pos = _parse_tokens(tokens, pos)
-            result.append(item)
-        # Skip closing parenthesis
-        if pos < len(tokens):
-            pos += 1
-        return result, pos
-
-    elif token == ")":
-        # Shouldn't happen in well-formed input
-        return [], pos + 1
-
-    else:
-        # Atom (string or symbol)
-        if token.startswith('"') and token.endswith('"'):
-            # Remove quotes and handle escapes
-            value = token[1:-1]
-            value = value.replace('\\"', '"')
-            value = value.replace("\\\\", "\\")
-            return value, pos + 1
-        return token, pos + 1
+        # Quoted string or unquoted atom
+        if group == 3:
+            value = match.group(3)
+            if "\\" in value:
+                value = value.replace('\\"', '"')
+                value = value.replace("\\\\", "\\")
+        else:
+            value = match.group()
+            if len(value) <= _INTERN_MAX_LEN:
+                value = sys.intern(value)
+
+        if stack:
+            node = stack[-1]
+            if started[node]:
+                atoms[node].append(value)
+            else:
+                tags[node] = value
+                started[node] = True
+
+    if expected < len(text):
+        msg = f"Malformed S-expression at offset {expected}"
+        raise ValueError(msg)
+
+    return FlatTree(tags, parent, atoms)
+
+
+def flat_elements_with_prop(
+    tree: FlatTree, element_name: str, property_name: str
+) -> List[Optional[str]]:
+    """
+    Extract one property from every matching element of a FlatTree.
+
+    Single forward pass over the tag column: matching elements are
+    registered as they appear, and property child nodes are matched
+    against them (parents always precede children).
+
+    Args:
+        tree: Flat-parsed S-expression
+        element_name: Name of element to find (e.g., "sheet")
+        property_name: Property to extract from each match
+
+    Returns:
+        One value (or None) per matching element, in document order
+    """
+    order: List[int] = []
+    values: Dict[int, Optional[str]] = {}
+    parent = tree.parent
+    atoms = tree.atoms
+
+    for i, tag in enumerate(tree.tags):
+        if tag == element_name:
+            order.append(i)
+            values[i] = None
+        elif tag == "property":
+            p = parent[i]
+            if p in values and values[p] is None:
+                node_atoms = atoms[i]
+                if len(node_atoms) >= 2 and node_atoms[0] == property_name:
+                    values[p] = node_atoms[1]
+
+    return [values[i] for i in order]
+
+
+def flat_elements_with_values(
+    tree: FlatTree, element_name: str, keys: Sequence[str]
+) -> List[Dict[str, str]]:
+    """
+    Extract several keyed values from every matching element of a FlatTree.
+
+    Flat counterpart to find_elements_with_values, for patterns like
+    (lib (name "foo")(uri "bar")).
+
+    Args:
+        tree: Flat-parsed S-expression
+        element_name: Name of element to find (e.g., "lib")
+        keys: Keys to extract from each match (e.g., ("name", "uri"))
+
+    Returns:
+        One {key: value} dict per matching element, in document order;
+        missing keys are absent from the dict
+    """
+    order: List[int] = []
+    values: Dict[int, Dict[str, str]] = {}
+    parent = tree.parent
+    atoms = tree.atoms
+
+    for i, tag in enumerate(tree.tags):
+        if tag == element_name:
+            order.append(i)
+            values[i] = {}
+        elif tag is not None and tag in keys:
+            p = parent[i]
+            if p in values and tag not in values[p] and atoms[i]:
+                values[p][tag] = atoms[i][0]
+
+    return [values[i] for i in order]
 
 
 def find_elements(tree: SExpr, element_name: str) -> List[List[Any]]:
@@ -127,32 +338,164 @@ def find_elements(tree: SExpr, element_name: str) -> List[List[Any]]:
         >>> find_elements(tree, 'sheet')
         [['sheet', ['at', '0', '0']], ['sheet', ['at', '1', '1']]]
     """
-    results: List[List[Any]] = []
-    _find_elements_recursive(tree, element_name, results)
+    return list(iter_elements(tree, element_name))
+
+
+def iter_elements(tree: SExpr, element_name: str) -> Iterator[List[Any]]:
+    """
+    Yield elements with given name in document order.
+
+    Lazy counterpart to find_elements for callers that only iterate
+    once and don't need the matches materialized.
+
+    Args:
+        tree: Parsed S-expression (nested lists)
+        element_name: Name of element to find (e.g., "sheet", "lib")
+
+    Yields:
+        Matching elements (each element is a list)
+    """
+    # Iterative walk with an explicit stack: avoids per-node call overhead
+    # and deep-recursion limits on large schematics. The exact type check
+    # is safe because the parser only produces list and str nodes.
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is list:
+            if node and node[0] == element_name:
+                yield node
+            # Push in reverse so matches come out in document order
+            stack.extend(child for child in reversed(node) if child.__class__ is list)
+
+
+def find_elements_with_prop(
+    tree: SExpr, element_name: str, property_name: str
+) -> List[Tuple[List[Any], Optional[str]]]:
+    """
+    Find elements and extract one property in a single tree walk.
+
+    Fuses find_elements + get_property so each matching element's
+    children are scanned while the walk already has them in hand,
+    instead of traversing the tree twice.
+
+    Args:
+        tree: Parsed S-expression (nested lists)
+        element_name: Name of element to find (e.g., "sheet")
+        property_name: Property to extract from each match
+
+    Returns:
+        List of (element, property value or None) tuples in document order
+    """
+    results: List[Tuple[List[Any], Optional[str]]] = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is list:
+            if node and node[0] == element_name:
+                value: Optional[str] = None
+                for item in node:
+                    if (
+                        item.__class__ is list
+                        and len(item) >= 3
+                        and item[0] == "property"
+                        and item[1] == property_name
+                    ):
+                        value = str(item[2])
+                        break
+                results.append((node, value))
+            stack.extend(child for child in reversed(node) if child.__class__ is list)
     return results
 
 
-def _find_elements_recursive(
-    node: SExpr, element_name: str, results: List[List[Any]]
-) -> None:
-    """Recursively search for elements with given name."""
-    if not isinstance(node, list):
-        return
+def find_elements_with_values(
+    tree: SExpr, element_name: str, keys: Sequence[str]
+) -> List[Tuple[List[Any], Dict[str, str]]]:
+    """
+    Find elements and extract several keyed values in a single tree walk.
+
+    Materialized counterpart to iter_elements_with_values.
+    """
+    return list(iter_elements_with_values(tree, element_name, keys))
+
+
+def iter_elements_with_values(
+    tree: SExpr, element_name: str, keys: Sequence[str]
+) -> Iterator[Tuple[List[Any], Dict[str, str]]]:
+    """
+    Yield elements and several keyed values in a single tree walk.
+
+    Fuses find_elements + get_element_value for patterns like
+    (lib (name "foo")(uri "bar")) where multiple keys are wanted
+    from each match.
+
+    Args:
+        tree: Parsed S-expression (nested lists)
+        element_name: Name of element to find (e.g., "lib")
+        keys: Keys to extract from each match (e.g., ("name", "uri"))
+
+    Yields:
+        (element, {key: value}) tuples in document order; missing keys
+        are absent from the dict
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is list:
+            if node and node[0] == element_name:
+                values: Dict[str, str] = {}
+                for item in node:
+                    if item.__class__ is list and len(item) >= 2:
+                        key = item[0]
+                        if key.__class__ is str and key in keys and key not in values:
+                            values[key] = str(item[1])
+                yield node, values
+            stack.extend(child for child in reversed(node) if child.__class__ is list)
+
+
+def element_properties(element: List[Any]) -> Dict[str, str]:
+    """
+    Collect all properties of a KiCad element in one walk.
+
+    Callers that want several properties from the same element should
+    use this instead of repeated get_property calls, which each re-scan
+    the element's children: building the dict once turns O(k*n) lookups
+    into O(n+k).
+
+    Args:
+        element: Parsed element (list)
+
+    Returns:
+        Dict mapping property names to values (first occurrence wins)
+
+    Example:
+        >>> elem = ['sheet', ['property', 'Sheetname', 'Sub'],
+        ...         ['property', 'Sheetfile', 'sub.kicad_sch']]
+        >>> element_properties(elem)
+        {'Sheetname': 'Sub', 'Sheetfile': 'sub.kicad_sch'}
+    """
+    properties: Dict[str, str] = {}
+    if element.__class__ is not list:
+        return properties
 
-    # Check if this node matches
-    if len(node) > 0 and node[0] == element_name:
-        results.append(node)
+    for item in element:
+        if (
+            item.__class__ is list
+            and len(item) >= 3
+            and item[0] == "property"
+            and item[1] not in properties
+        ):
+            properties[item[1]] = str(item[2])
 
-    # Recurse into children
-    for child in node:
-        if isinstance(child, list):
-            _find_elements_recursive(child, element_name, results)
+    return properties
 
 
 def get_property(element: List[Any], property_name: str) -> Optional[str]:
     """
     Extract property value from a KiCad element.
 
+    Convenience wrapper for single lookups; callers pulling a property
+    from every match of a tree walk should prefer find_elements_with_prop.
+
     KiCad properties look like: (property "Name" "Value" ...)
 
     Args:
@@ -185,6 +528,9 @@ def get_element_value(element: List[Any], key: str) -> Optional[str]:
     Handles patterns like: (lib (name "foo")(uri "bar"))
     where you want to get "bar" given key "uri"
 
+    Convenience wrapper for single lookups; callers wanting several keys
+    per element should prefer find_elements_with_values.
+
     Args:
         element: Parsed element (list)
         key: Key to find (e.g., "uri", "name")
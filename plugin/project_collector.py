@@ -2,11 +2,96 @@
 Collects all files needed for a complete KiCad project export.
 """
 
+import functools
 import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Set
 
-from .kicad_parser import find_elements, get_element_value, get_property, parse_kicad
+from .kicad_parser import (
+    flat_elements_with_prop,
+    flat_elements_with_values,
+    parse_kicad_flat,
+)
+
+# Fast paths for the two queries the collector actually runs. A Sheetfile
+# property can also appear as a user-defined symbol field, so its regex is
+# only a cheap pre-filter deciding whether a file needs parsing at all;
+# sym-lib-table entries follow a fixed (lib (name ..)(type ..)(uri ..) ..)
+# layout, so their regex extracts the wanted strings without a tree.
+_SHEETFILE_RE = re.compile(r'\(\s*property\s+"Sheetfile"')
+_LIB_ENTRY_RE = re.compile(
+    r'\(\s*lib\s+\(\s*name\s+"([^"]*)"\s*\)'
+    r'\s*\(\s*type\s+"[^"]*"\s*\)'
+    r'\s*\(\s*uri\s+"([^"]*)"\s*\)'
+)
+
+
+def _unescape(value: str) -> str:
+    """Undo S-expression string escapes in a regex-extracted value."""
+    if "\\" in value:
+        value = value.replace('\\"', '"')
+        value = value.replace("\\\\", "\\")
+    return value
+
+
+def _extract_sheet_files(content: str) -> List[Optional[str]]:
+    """
+    Extract Sheetfile values from schematic text.
+
+    The regex only pre-filters: a hit may be a user-defined symbol field
+    named "Sheetfile" rather than a sheet reference, so matching files
+    are parsed and extraction stays scoped to sheet blocks. Leaf
+    schematics - the common case in a hierarchy - skip the parse.
+    """
+    if _SHEETFILE_RE.search(content) is None:
+        return []
+    tree = parse_kicad_flat(content)
+    return flat_elements_with_prop(tree, "sheet", "Sheetfile")
+
+
+def _extract_lib_entries(content: str) -> List[Dict[str, str]]:
+    """
+    Extract {name, uri} entries from sym-lib-table text.
+
+    Same regex-first, parse-fallback strategy as _extract_sheet_files.
+    """
+    pairs = _LIB_ENTRY_RE.findall(content)
+    if pairs:
+        return [{"name": _unescape(name), "uri": _unescape(uri)} for name, uri in pairs]
+    if re.search(r"\(\s*lib\b", content) is None:
+        return []
+    tree = parse_kicad_flat(content)
+    return flat_elements_with_values(tree, "lib", ("name", "uri"))
+
+
+def _exists(path: Path) -> bool:
+    """Check existence with one os.stat call (Path.exists adds overhead)."""
+    try:
+        os.stat(path)
+    except OSError:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_str(path_str: str) -> str:
+    """
+    Resolved absolute form of a path string, cached per input.
+
+    os.path.realpath skips pathlib's object construction, and interning
+    the result makes the visited/collected set lookups pointer compares,
+    since the same file is keyed repeatedly during hierarchy traversal.
+    """
+    return sys.intern(os.path.realpath(path_str))
+
+
+# Workers for scanning sibling subsheets; reading and parsing .kicad_sch
+# files releases the GIL during I/O, so a few threads overlap well.
+_SHEET_WORKERS = 4
 
 
 class ProjectCollector:
@@ -29,16 +114,35 @@ class ProjectCollector:
         self.pcb_path = Path(pcb_path)
         self.project_dir = self.pcb_path.parent
         self.project_name = self.pcb_path.stem
+        self._project_dir_str = str(self.project_dir)
+        self._project_dir_abs = os.path.abspath(self._project_dir_str)
+
+        # sym-lib-table entries often repeat URI prefixes; cache resolution
+        # per URI. Wrapping the bound method keeps the cache per-instance.
+        self._resolve_lib_path = functools.lru_cache(maxsize=256)(
+            self._resolve_lib_path_uncached
+        )
 
-        # Files to include in zip
-        self.collected_files: Set[Path] = set()
+        # Files to include in zip. Stored as path strings: sets of str
+        # hash and compare much faster than sets of Path, and Path objects
+        # are only needed again at the zip boundary.
+        self.collected_files: Set[str] = set()
 
-        # External files (outside project dir) with reason
-        self.external_files: Dict[Path, str] = {}
+        # External files (outside project dir) with reason, keyed the same
+        self.external_files: Dict[str, str] = {}
 
         # Warnings/errors encountered
         self.warnings: List[str] = []
 
+        # Guards collector state when sheet scanning fans out to threads
+        self._state_lock = threading.Lock()
+
+        # Sheetfile values per resolved path. Within one collect_all the
+        # visited set already dedups shared subsheets before they reach
+        # the scanner; this memoizes across repeated collect_all calls on
+        # the same instance (e.g. a dialog refresh).
+        self._sheet_cache: Dict[str, List[Optional[str]]] = {}
+
     def collect_all(self) -> None:
         """Collect all project files."""
         self._collect_core_files()
@@ -48,90 +152,127 @@ class ProjectCollector:
     def _collect_core_files(self) -> None:
         """Collect .kicad_pcb, .kicad_pro, .kicad_sch files."""
         # PCB file (always exists since we got path from board)
-        if self.pcb_path.exists():
-            self.collected_files.add(self.pcb_path)
+        if _exists(self.pcb_path):
+            self.collected_files.add(str(self.pcb_path))
 
         # Project file
         pro_path = self.project_dir / f"{self.project_name}.kicad_pro"
-        if pro_path.exists():
-            self.collected_files.add(pro_path)
+        if _exists(pro_path):
+            self.collected_files.add(str(pro_path))
         else:
             self.warnings.append(f"Project file not found: {pro_path.name}")
 
         # Main schematic file
         sch_path = self.project_dir / f"{self.project_name}.kicad_sch"
-        if sch_path.exists():
-            self.collected_files.add(sch_path)
+        if _exists(sch_path):
+            self.collected_files.add(str(sch_path))
         else:
             self.warnings.append(f"Schematic file not found: {sch_path.name}")
 
     def _collect_schematic_hierarchy(self) -> None:
-        """Recursively collect all hierarchical sheet files."""
+        """Collect all hierarchical sheet files, level by level."""
         main_sch = self.project_dir / f"{self.project_name}.kicad_sch"
-        if not main_sch.exists():
+        if not _exists(main_sch):
             return
 
-        visited: Set[Path] = set()
-        self._parse_schematic_sheets(main_sch, visited)
+        # Breadth-first over the sheet tree: sheets within a level are
+        # independent, so each level with multiple new files fans out to
+        # a thread pool. Deduplication against visited stays on this
+        # thread, which also prevents reference cycles.
+        visited: Set[str] = set()
+        frontier: List[Path] = [main_sch]
+        executor: Optional[ThreadPoolExecutor] = None
 
-    def _parse_schematic_sheets(self, sch_path: Path, visited: Set[Path]) -> None:
+        try:
+            while frontier:
+                batch: List[Path] = []
+                for sch_path in frontier:
+                    resolved = _resolve_str(str(sch_path))
+                    if resolved not in visited:
+                        visited.add(resolved)
+                        batch.append(sch_path)
+
+                if not batch:
+                    break
+                if len(batch) == 1:
+                    children = [self._parse_schematic_sheets(batch[0])]
+                else:
+                    if executor is None:
+                        executor = ThreadPoolExecutor(max_workers=_SHEET_WORKERS)
+                    children = list(executor.map(self._parse_schematic_sheets, batch))
+
+                frontier = [path for found in children for path in found]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _parse_schematic_sheets(self, sch_path: Path) -> List[Path]:
         """
         Parse a schematic file for sheet references.
 
+        May run on a worker thread; collector state is touched under
+        _state_lock.
+
         Args:
             sch_path: Path to .kicad_sch file
-            visited: Set of already-visited files (prevents infinite loops)
+
+        Returns:
+            Paths of existing subsheets referenced by this file
         """
-        resolved = sch_path.resolve()
-        if resolved in visited:
-            return
-        visited.add(resolved)
+        resolved = _resolve_str(str(sch_path))
 
-        if not sch_path.exists():
-            self.warnings.append(f"Referenced schematic not found: {sch_path}")
-            return
+        if not _exists(sch_path):
+            with self._state_lock:
+                self.warnings.append(f"Referenced schematic not found: {sch_path}")
+            return []
 
+        found: List[Path] = []
         try:
-            content = sch_path.read_text(encoding="utf-8")
-            tree = parse_kicad(content)
-
-            # Find all sheet elements
-            sheets = find_elements(tree, "sheet")
-
-            for sheet in sheets:
-                # Get the Sheetfile property
-                sheet_file = get_property(sheet, "Sheetfile")
+            # Cache access is deliberately outside _state_lock: dict
+            # get/set are atomic under the GIL, and the worst case is one
+            # duplicate scan of the same file
+            if resolved in self._sheet_cache:
+                sheet_files = self._sheet_cache[resolved]
+            else:
+                # read_bytes + one-shot decode skips text mode's chunked
+                # decoding and newline translation
+                content = sch_path.read_bytes().decode("utf-8")
+                sheet_files = _extract_sheet_files(content)
+                self._sheet_cache[resolved] = sheet_files
+
+            for sheet_file in sheet_files:
                 if not sheet_file:
                     continue
 
                 # Resolve path relative to current schematic's directory
                 sheet_path = sch_path.parent / sheet_file
 
-                if sheet_path.exists():
-                    self.collected_files.add(sheet_path.resolve())
-                    # Recursively parse this sheet
-                    self._parse_schematic_sheets(sheet_path, visited)
+                if _exists(sheet_path):
+                    with self._state_lock:
+                        self.collected_files.add(_resolve_str(str(sheet_path)))
+                    # Caller recurses into this sheet on the next level
+                    found.append(sheet_path)
                 else:
-                    self.warnings.append(f"Subsheet not found: {sheet_file}")
+                    with self._state_lock:
+                        self.warnings.append(f"Subsheet not found: {sheet_file}")
 
         except Exception as e:
-            self.warnings.append(f"Error parsing {sch_path.name}: {e}")
+            with self._state_lock:
+                self.warnings.append(f"Error parsing {sch_path.name}: {e}")
+
+        return found
 
     def _collect_symbol_libraries(self) -> None:
         """Collect external symbol libraries from sym-lib-table."""
         lib_table_path = self.project_dir / "sym-lib-table"
-        if not lib_table_path.exists():
+        if not _exists(lib_table_path):
             return
 
         try:
-            content = lib_table_path.read_text(encoding="utf-8")
-            tree = parse_kicad(content)
+            content = lib_table_path.read_bytes().decode("utf-8")
 
-            # Find all lib entries
-            libs = find_elements(tree, "lib")
-
-            for lib in libs:
-                uri = get_element_value(lib, "uri")
+            for values in _extract_lib_entries(content):
+                uri = values.get("uri")
                 if not uri:
                     continue
 
@@ -139,23 +280,25 @@ class ProjectCollector:
                 if lib_path is None:
                     continue
 
-                if lib_path.exists():
+                if _exists(lib_path):
                     # Check if external (outside project directory)
                     if self._is_external(lib_path):
-                        lib_name = get_element_value(lib, "name") or lib_path.name
-                        self.external_files[lib_path.resolve()] = lib_name
+                        lib_name = values.get("name") or lib_path.name
+                        self.external_files[_resolve_str(str(lib_path))] = lib_name
                     else:
-                        self.collected_files.add(lib_path.resolve())
+                        self.collected_files.add(_resolve_str(str(lib_path)))
                 else:
                     self.warnings.append(f"Library not found: {uri}")
 
         except Exception as e:
             self.warnings.append(f"Error parsing sym-lib-table: {e}")
 
-    def _resolve_lib_path(self, uri: str) -> Optional[Path]:
+    def _resolve_lib_path_uncached(self, uri: str) -> Optional[Path]:
         """
         Resolve library URI to actual path.
 
+        Called through the lru_cache wrapper set up in __init__.
+
         Handles:
         - ${KIPRJMOD} -> project directory
         - Absolute paths
@@ -177,26 +320,28 @@ class ProjectCollector:
 
         # Replace ${KIPRJMOD} with project directory
         if uri.startswith("${KIPRJMOD}"):
-            uri = uri.replace("${KIPRJMOD}", str(self.project_dir))
+            uri = self._project_dir_str + uri[len("${KIPRJMOD}") :]
 
         # Normalize path separators
         uri = uri.replace("\\", "/")
 
-        path = Path(uri)
-
-        # If relative, resolve from project directory
-        if not path.is_absolute():
-            path = self.project_dir / path
-
-        return path
+        # Build the Path once; only prepend the project dir for relative URIs
+        if os.path.isabs(uri):
+            return Path(uri)
+        return self.project_dir / uri
 
     def _is_external(self, path: Path) -> bool:
         """Check if path is outside the project directory."""
+        # Lexical comparison against the precomputed absolute project dir;
+        # unlike resolve().relative_to() this needs no stat syscalls.
         try:
-            path.resolve().relative_to(self.project_dir.resolve())
-            return False
+            common = os.path.commonpath(
+                [os.path.abspath(str(path)), self._project_dir_abs]
+            )
         except ValueError:
+            # Different drives (Windows) or mixed abs/rel paths
             return True
+        return common != self._project_dir_abs
 
     def get_files_for_zip(self) -> Dict[Path, str]:
         """
@@ -214,8 +359,10 @@ class ProjectCollector:
         """
         result: Dict[Path, str] = {}
 
-        # Project files (use path relative to project dir)
-        for file_path in self.collected_files:
+        # Project files (use path relative to project dir); Path objects
+        # are rebuilt once per entry here at the zip boundary
+        for path_str in self.collected_files:
+            file_path = Path(path_str)
             try:
                 rel_path = file_path.relative_to(self.project_dir)
                 result[file_path] = str(rel_path)
@@ -224,10 +371,10 @@ class ProjectCollector:
                 result[file_path] = file_path.name
 
         # External libraries go in external_libs/ folder
-        for file_path, lib_name in self.external_files.items():
+        for path_str in self.external_files:
             # Use library name + extension for clarity
-            archive_name = f"external_libs/{file_path.name}"
-            result[file_path] = archive_name
+            file_path = Path(path_str)
+            result[file_path] = f"external_libs/{file_path.name}"
 
         return result
 
@@ -245,14 +392,15 @@ class ProjectCollector:
             "External Libraries": [],
         }
 
-        for file_path in sorted(self.collected_files):
-            if file_path.suffix in (".kicad_pcb", ".kicad_pro"):
-                result["Project Files"].append(file_path.name)
-            elif file_path.suffix == ".kicad_sch":
-                result["Schematic Files"].append(file_path.name)
+        for path_str in sorted(self.collected_files):
+            suffix = os.path.splitext(path_str)[1]
+            if suffix in (".kicad_pcb", ".kicad_pro"):
+                result["Project Files"].append(os.path.basename(path_str))
+            elif suffix == ".kicad_sch":
+                result["Schematic Files"].append(os.path.basename(path_str))
 
-        for file_path in sorted(self.external_files.keys()):
-            result["External Libraries"].append(file_path.name)
+        for path_str in sorted(self.external_files):
+            result["External Libraries"].append(os.path.basename(path_str))
 
         # Remove empty categories
         return {k: v for k, v in result.items() if v}
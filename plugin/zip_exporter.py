@@ -2,9 +2,26 @@
 Creates zip archive from collected project files.
 """
 
+import os
+import shutil
 import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
+
+# KiCad s-expression files compress nearly as well at level 3 as at the
+# zlib default of 6, for a fraction of the CPU.
+_COMPRESS_LEVEL = 3
+
+# Copy buffer for streaming files into the archive (default is 8 KiB,
+# which makes large .kicad_pcb files crawl).
+_COPY_BUFFER = 1 << 20
+
+# Files below this size are read inline; thread overhead exceeds the work.
+_PREFETCH_MIN_SIZE = 4096
+
+_ZipEntry = Tuple[int, Path, str]
 
 
 class ZipExporter:
@@ -34,8 +51,77 @@ class ZipExporter:
             FileNotFoundError: If a source file doesn't exist
             PermissionError: If cannot write to output path
         """
-        with zipfile.ZipFile(self.output_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for source_path, archive_path in files.items():
-                if source_path.exists():
-                    zf.write(source_path, archive_path)
+        # One stat per file: existence check plus size for ordering.
+        # Largest files first front-loads the compressor's work.
+        entries = []
+        for source_path, archive_path in files.items():
+            try:
+                size = os.stat(source_path).st_size
+            except OSError:
+                continue
+            entries.append((size, source_path, archive_path))
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+
+        prefetch_count = sum(1 for size, _, _ in entries if size >= _PREFETCH_MIN_SIZE)
+
+        with zipfile.ZipFile(
+            self.output_path,
+            "w",
+            zipfile.ZIP_DEFLATED,
+            compresslevel=_COMPRESS_LEVEL,
+        ) as zf:
+            if prefetch_count > 1:
+                self._write_prefetched(zf, entries)
+            else:
+                self._write_streamed(zf, entries)
+
+    @staticmethod
+    def _write_streamed(zf: zipfile.ZipFile, entries: List[_ZipEntry]) -> None:
+        """Stream each file into the archive sequentially."""
+        for _size, source_path, archive_path in entries:
+            info = zipfile.ZipInfo.from_file(source_path, archive_path)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # zf.open(info, ...) takes the level from the info, not from
+            # the ZipFile; same pattern ZipFile.write uses internally
+            info._compresslevel = _COMPRESS_LEVEL  # type: ignore[attr-defined]
+            with open(source_path, "rb") as src, zf.open(info, "w") as dst:
+                shutil.copyfileobj(src, dst, _COPY_BUFFER)
+
+    @staticmethod
+    def _write_prefetched(zf: zipfile.ZipFile, entries: List[_ZipEntry]) -> None:
+        """
+        Write entries while reading upcoming files on a thread pool.
+
+        zipfile offers no public way to splice pre-compressed members, so
+        compression stays on this thread; the pool overlaps file I/O with
+        it instead. A bounded window of outstanding reads caps memory.
+        """
+        workers = min(8, os.cpu_count() or 1)
+        window = workers * 2
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending: deque = deque()
+
+            def write_one() -> None:
+                (_size, source_path, archive_path), future = pending.popleft()
+                data = (
+                    future.result() if future is not None else source_path.read_bytes()
+                )
+                info = zipfile.ZipInfo.from_file(source_path, archive_path)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                # writestr also ignores the ZipFile-level compresslevel
+                # when given a ZipInfo; pass it explicitly
+                zf.writestr(info, data, compresslevel=_COMPRESS_LEVEL)
+
+            for entry in entries:
+                while len(pending) >= window:
+                    write_one()
+                future = (
+                    pool.submit(entry[1].read_bytes)
+                    if entry[0] >= _PREFETCH_MIN_SIZE
+                    else None
+                )
+                pending.append((entry, future))
 
+            while pending:
+                write_one()